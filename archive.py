@@ -0,0 +1,84 @@
+from common.utiles import utctimestampnow
+from db.mongo import Tables
+from pymongo import ReplaceOne
+
+from .default_settings import settings
+from .logger import logger
+from .models import Bank, PaymentStatus
+from .utils import get_collection
+
+
+def _cold_collection(db):
+    return get_collection(db, settings.ARCHIVE_COLLECTION)
+
+
+def _hot_collection(db):
+    return get_collection(db, Tables.transaction)
+
+
+async def ensure_archive_indexes(db):
+    """
+    Index the archive queries: the terminal record scan on the hot collection
+    and tracking code lookups on the cold one, which keeps years of rows.
+    """
+    await _hot_collection(db).create_index([(Bank.status, 1), (Bank.created_at, 1)])
+    await _cold_collection(db).create_index(Bank.tracking_code)
+
+
+async def archive_batch(db, older_than: int = None, batch_size: int = None) -> int:
+    """
+    Move one batch of terminal records from the hot collection to the cold one.
+
+    Records are written to the cold collection before they are removed from
+    the hot one, so an interrupted batch only leaves duplicates which the next
+    run overwrites.
+
+    :return: number of archived records
+    """
+    if older_than is None:
+        older_than = settings.ARCHIVE_AFTER_SECONDS
+    if batch_size is None:
+        batch_size = settings.ARCHIVE_BATCH_SIZE
+
+    cursor = _hot_collection(db).find({
+        Bank.status: {"$in": PaymentStatus.terminal()},
+        Bank.created_at: {"$lt": utctimestampnow() - older_than},
+    }).limit(batch_size)
+    documents = await cursor.to_list(length=batch_size)
+    if not documents:
+        return 0
+
+    await _cold_collection(db).bulk_write(
+        [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in documents],
+        ordered=False,
+    )
+    ids = [doc["_id"] for doc in documents]
+    await _hot_collection(db).delete_many({"_id": {"$in": ids}})
+
+    logger.debug("Archive bank records", count=len(ids))
+    return len(ids)
+
+
+async def archive_transactions(db, older_than: int = None, batch_size: int = None) -> int:
+    """Archive batches until no eligible record is left in the hot collection"""
+    await ensure_archive_indexes(db)
+    total = 0
+    while True:
+        count = await archive_batch(db, older_than=older_than, batch_size=batch_size)
+        total += count
+        if not count:
+            break
+    logger.debug("Archive bank records finished", count=total)
+    return total
+
+
+async def find_archived(db, tracking_code: str) -> Bank:
+    """Find a bank record in the cold collection, raise Bank.DoesNotExist otherwise"""
+    document = await _cold_collection(db).find_one({
+        Bank.tracking_code: tracking_code,
+    })
+    if document is None:
+        raise Bank.DoesNotExist()
+    if settings.FAST_SERIALIZATION:
+        return Bank.from_document(document)
+    return Bank(**document)
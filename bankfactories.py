@@ -1,17 +1,17 @@
 from __future__ import absolute_import, unicode_literals
 
 import importlib
-import logging
 
 from .default_settings import settings
 from .banks import BaseBank
 from .exceptions.exceptions import BankGatewayAutoConnectionFailed
+from .logger import logger
 from .models import BankType
 
 
 class BankFactory:
     def __init__(self):
-        logging.debug("Create bank factory")
+        logger.debug("Create bank factory")
         self._secret_value_reader = self._import(
             settings.SETTING_VALUE_READER_CLASS)()
 
@@ -29,7 +29,7 @@ class BankFactory:
         """
         bank_class = self._import(self._secret_value_reader.klass(
             bank_type=bank_type))
-        logging.debug("Import bank class")
+        logger.debug("Import bank class")
 
         return bank_class, self._secret_value_reader.read(bank_type=bank_type)
 
@@ -37,20 +37,24 @@ class BankFactory:
         """Build bank class"""
         if not bank_type:
             bank_type = self._secret_value_reader.default()
-        logging.debug("Request create bank", extra={"bank_type": bank_type})
+        logger.debug("Request create bank", bank_type=bank_type)
 
         bank_klass, bank_settings = self._import_bank(bank_type)
         bank_settings.update({'db': db})
         bank = bank_klass(**bank_settings)
         bank.set_currency(self._secret_value_reader.currency())
 
-        logging.debug("Create bank")
+        logger.debug("Create bank")
         return bank
 
     def create_default(self, db) -> BaseBank:
         """Build default class"""
         return self.create(db=db, bank_type=settings.BANK_DEFAULT)
 
+    def get_bank_priorities(self) -> list:
+        """Configured bank types, default first"""
+        return self._secret_value_reader.get_bank_priorities()
+
     # def auto_create(self, identifier: str = "1", amount=None) -> BaseBank:
     #     logging.debug("Request create bank automatically")
     #     bank_list = self._secret_value_reader.get_bank_priorities(identifier)
@@ -1,12 +1,21 @@
 import abc
-import logging
 
 from common.utiles import utctimestampnow
 from db.mongo import Mongo, MongoCrud, create_objectid
 
 import six
 
+from ..archive import find_archived
 from ..default_settings import settings
+from ..leases import (
+    acquire_verify_lease,
+    new_lease_owner,
+    release_verify_lease,
+    renew_verify_lease,
+    wait_for_verify_result
+)
+from ..lifecycle import lifecycle
+from ..logger import logger
 from ..exceptions import (
     AmountDoesNotSupport,
     BankGatewayStateInvalid,
@@ -14,7 +23,9 @@ from ..exceptions import (
     CurrencyDoesNotSupport, SettingDoesNotExist
 )
 from ..models import Bank, CurrencyEnum, PaymentStatus
-from ..utils import append_querystring
+from ..stats import schedule_status_change
+from ..tracing import NOOP_SPAN, tracer
+from ..utils import append_querystring, get_collection
 
 
 # TODO: handle and expire record after 15 minutes
@@ -34,6 +45,8 @@ class BaseBank:
     _bank: Bank = None
     _request = None
     _db: Mongo = None
+    _verify_lease_owner: str = None
+    _verify_lease_acquired: bool = None
 
     def __init__(self, **kwargs):
         self.default_setting_kwargs = kwargs
@@ -85,7 +98,7 @@ class BaseBank:
 
     @abc.abstractmethod
     def prepare_pay(self):
-        logging.debug("Prepare pay method")
+        logger.debug("Prepare pay method")
         self.prepare_amount()
         # tracking_code = int(str(uuid.uuid4().int)
         #                     [-1 * settings.TRACKING_CODE_LENGTH:])
@@ -98,7 +111,7 @@ class BaseBank:
 
     @abc.abstractmethod
     async def pay(self):
-        logging.debug("Pay method")
+        logger.debug("Pay method")
         self.prepare_pay()
 
     @abc.abstractmethod
@@ -107,34 +120,37 @@ class BaseBank:
 
     @abc.abstractmethod
     async def prepare_verify(self, tracking_code):
-        logging.debug("Prepare verify method")
+        logger.debug("Prepare verify method")
         self._set_tracking_code(tracking_code)
         await self._set_bank_record()
         self.prepare_amount()
 
     @abc.abstractmethod
     async def verify(self, tracking_code):
-        logging.debug("Verify method")
+        logger.debug("Verify method")
         await self.prepare_verify(tracking_code)
 
     async def ready(self, col_name, col_obj) -> Bank:
-        await self.pay()
-        bank = Bank(
-            _id=self.get_tracking_code(),
-            bank_type=self.get_bank_type(),
-            amount=self.get_amount(),
-            reference_number=self.get_reference_number(),
-            response_result=self.get_transaction_status_text(),
-            tracking_code=self.get_tracking_code(),
-            phone=self.get_mobile_number(),
-            col_name=col_name,
-            col_obj=col_obj
-        )
-        self._bank = bank
-        if self._client_callback_url:
-            self._bank.callback_url = self._client_callback_url
-
-        await self._set_payment_status(PaymentStatus.WAITING)
+        async with lifecycle.operation("ready"):
+            with self._span("bank.ready") as span:
+                await self.pay()
+                span.set_tracking_code(self.get_tracking_code())
+                bank = Bank(
+                    _id=self.get_tracking_code(),
+                    bank_type=self.get_bank_type(),
+                    amount=self.get_amount(),
+                    reference_number=self.get_reference_number(),
+                    response_result=self.get_transaction_status_text(),
+                    tracking_code=self.get_tracking_code(),
+                    phone=self.get_mobile_number(),
+                    col_name=col_name,
+                    col_obj=col_obj
+                )
+                self._bank = bank
+                if self._client_callback_url:
+                    self._bank.callback_url = self._client_callback_url
+
+                await self._set_payment_status(PaymentStatus.WAITING)
 
         return bank
 
@@ -143,11 +159,24 @@ class BaseBank:
         pass
 
     async def verify_from_gateway(self, request):
-        self.set_request(request)
-        await self.prepare_verify_from_gateway()
-        if not self._bank.status == PaymentStatus.CANCEL_BY_USER:
-            await self._set_payment_status(PaymentStatus.RETURN_FROM_BANK)
-            await self.verify(self.get_tracking_code())
+        async with lifecycle.operation("verify_from_gateway"):
+            with self._span("bank.verify_from_gateway") as span:
+                self.set_request(request)
+                try:
+                    await self.prepare_verify_from_gateway()
+                    span.set_tracking_code(self.get_tracking_code())
+                    if not await self._acquire_verify_lease():
+                        logger.debug("Another process verifies the payment")
+                        await self._wait_verify_result()
+                    elif self._bank.status not in PaymentStatus.terminal():
+                        await self._set_payment_status(PaymentStatus.RETURN_FROM_BANK)
+                        if await self._renew_verify_lease():
+                            await self.verify(self.get_tracking_code())
+                        else:
+                            await self._wait_verify_result()
+                finally:
+                    await self._release_verify_lease()
+                span.set_attribute("status", self._bank.status)
 
     def get_client_callback_url(self):
         # return append_querystring(
@@ -157,7 +186,7 @@ class BaseBank:
         return self._bank.callback_url
 
     def redirect_client_callback(self):
-        logging.debug("Redirect to client")
+        logger.debug("Redirect to client")
         return self.get_client_callback_url()
 
     async def get_bank(self):
@@ -177,40 +206,112 @@ class BaseBank:
         if not self._bank:
             self._client_callback_url = callback_url
         else:
-            logging.critical(
+            logger.critical(
                 "You are change the call back url in invalid situation.",
-                extra={
-                    "bank_id": self._bank.pk,
-                    "status": self._bank.status,
-                },
+                bank_id=self._bank.pk,
+                status=self._bank.status,
             )
             raise BankGatewayStateInvalid(
                 "Bank state not equal to waiting. Probably finish "
                 f"or redirect to bank gateway. status is {self._bank.status}"
             )
 
+    # """verify lease"""
+
+    async def _acquire_verify_lease(self) -> bool:
+        """
+        Only one attempt per verification, call it in prepare_verify_from_gateway
+        as soon as the tracking code is known to guard the writes done there.
+        """
+        if not self.get_tracking_code():
+            return False
+        if self._verify_lease_acquired is None:
+            owner = new_lease_owner()
+            with self._span("db.acquire_verify_lease"):
+                self._verify_lease_acquired = await acquire_verify_lease(
+                    self._db, self.get_tracking_code(), owner)
+            if self._verify_lease_acquired:
+                self._verify_lease_owner = owner
+        return self._verify_lease_acquired
+
+    async def _renew_verify_lease(self) -> bool:
+        """False when another process took the expired lease, it verifies then"""
+        if not self._verify_lease_owner:
+            return False
+        if await renew_verify_lease(
+                self._db, self.get_tracking_code(), self._verify_lease_owner):
+            return True
+        logger.critical("Verify lease expired before verify",
+                        tracking_code=self.get_tracking_code())
+        self._verify_lease_owner = None
+        return False
+
+    async def _release_verify_lease(self):
+        if self._verify_lease_owner:
+            with self._span("db.release_verify_lease"):
+                await release_verify_lease(
+                    self._db, self.get_tracking_code(), self._verify_lease_owner)
+        self._verify_lease_owner = None
+        self._verify_lease_acquired = None
+
+    async def _wait_verify_result(self):
+        with self._span("db.wait_verify_result"):
+            await wait_for_verify_result(self._db, self.get_tracking_code())
+        await self._set_bank_record()
+
     def _set_reference_number(self, reference_number):
         """reference number get from bank"""
         self._reference_number = reference_number
 
-    async def _set_bank_record(self):
-        try:
-            self._bank = await MongoCrud.find_one(self._db, Bank, {
+    async def _find_bank_record(self) -> Bank:
+        with self._span("db.find_bank"):
+            if not settings.FAST_SERIALIZATION:
+                return await MongoCrud.find_one(self._db, Bank, {
+                    Bank.tracking_code: self.get_tracking_code(),
+                })
+            document = await get_collection(self._db, Bank.Config.collection).find_one({
                 Bank.tracking_code: self.get_tracking_code(),
             })
-            logging.debug("Set reference find bank object.")
+            if document is None:
+                raise Bank.DoesNotExist()
+            return Bank.from_document(document)
+
+    async def _save_bank_record(self, upsert=False):
+        with self._span("db.save_bank", status=self._bank.status):
+            if not settings.FAST_SERIALIZATION:
+                await MongoCrud.update_one_set(
+                    self._db, Bank, {Bank.id: self._bank.id},
+                    self._bank, upsert=upsert)
+                return
+            await get_collection(self._db, Bank.Config.collection).update_one(
+                {Bank.id: self._bank.id},
+                {"$set": self._bank.to_document()},
+                upsert=upsert)
+
+    async def _set_bank_record(self):
+        try:
+            self._bank = await self._find_bank_record()
+            logger.debug("Set reference find bank object.")
         except Bank.DoesNotExist:
-            logging.debug("Cant find bank record object.")
+            await self._set_archived_bank_record()
+
+   
+
+        self.set_amount(self._bank.amount)
+
+    async def _set_archived_bank_record(self):
+        try:
+            with self._span("db.find_archived_bank"):
+                self._bank = await find_archived(self._db, self.get_tracking_code())
+            logger.debug("Set reference find archived bank object.")
+        except Bank.DoesNotExist:
+            logger.debug("Cant find bank record object.")
             raise BankGatewayStateInvalid(
                 "Cant find bank record with reference number reference number is {}".format(
                     self.get_reference_number()
                 )
             )
 
-   
-
-        self.set_amount(self._bank.amount)
-
     def get_reference_number(self):
         return self._reference_number
 
@@ -223,9 +324,9 @@ class BaseBank:
     async def _set_payment_status(self, payment_status):
         if payment_status == PaymentStatus.RETURN_FROM_BANK and \
                 self._bank.status != PaymentStatus.REDIRECT_TO_BANK:
-            logging.debug(
+            logger.debug(
                 "Payment status is not status suitable.",
-                extra={"status": self._bank.status},
+                status=self._bank.status,
             )
             raise BankGatewayStateInvalid(
                 "You change the status bank record before/after this record change status from redirect to bank. "
@@ -234,12 +335,10 @@ class BaseBank:
 
         self._bank.status = payment_status
 
-        await MongoCrud.update_one_set(
-            self._db, Bank, {Bank.id: self._bank.id},
-            self._bank, upsert=True)
+        await self._save_bank_record(upsert=True)
+        schedule_status_change(self._db, self._bank)
 
-        logging.debug("Change bank payment status",
-                      extra={"status": payment_status})
+        logger.debug("Change bank payment status", status=payment_status)
 
     def set_gateway_currency(self, currency: CurrencyEnum):
         if currency not in [CurrencyEnum.IRR, CurrencyEnum.IRT]:
@@ -312,13 +411,14 @@ class BaseBank:
         pass
 
     async def redirect_gateway(self):
-        if (utctimestampnow() - self._bank.created_at) > 120:
-            await self._set_payment_status(PaymentStatus.EXPIRE_GATEWAY_TOKEN)
-            logging.debug("Redirect to bank expire!")
-            raise BankGatewayTokenExpired()
-        logging.debug("Redirect to bank")
-        await self._set_payment_status(PaymentStatus.REDIRECT_TO_BANK)
-        return self.get_gateway_payment_url()
+        with self._span("bank.redirect_gateway"):
+            if (utctimestampnow() - self._bank.created_at) > 120:
+                await self._set_payment_status(PaymentStatus.EXPIRE_GATEWAY_TOKEN)
+                logger.debug("Redirect to bank expire!")
+                raise BankGatewayTokenExpired()
+            logger.debug("Redirect to bank")
+            await self._set_payment_status(PaymentStatus.REDIRECT_TO_BANK)
+            return self.get_gateway_payment_url()
 
     def get_gateway_payment_url(self):
         url = self._get_gateway_payment_url_parameter()
@@ -328,3 +428,15 @@ class BaseBank:
 
     def _get_gateway_callback_url(self):
         return settings.CALLBACK_NAMESPACE
+
+    def get_warmup_urls(self) -> list:
+        """gateway urls to open connections to on startup"""
+        return []
+
+    # """tracing"""
+
+    def _span(self, name, **attributes):
+        if not tracer.enabled:
+            return NOOP_SPAN
+        return tracer.span(name, self.get_tracking_code(),
+                           bank_type=self.get_bank_type(), **attributes)
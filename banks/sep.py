@@ -1,14 +1,14 @@
-import logging
-
 import aiohttp
 from aiohttp.client_exceptions import ServerTimeoutError, ClientConnectionError
 
-from db.mongo import MongoCrud
-
-from .banks import BaseBank, Bank
+from .banks import BaseBank
+from ..default_settings import settings
 from ..exceptions import BankGatewayConnectionError, SettingDoesNotExist
 from ..exceptions.exceptions import BankGatewayRejectPayment
+from ..lifecycle import lifecycle
+from ..logger import logger
 from ..models import BankType, CurrencyEnum, PaymentStatus
+from ..utils import json_loads
 
 
 class SEP(BaseBank):
@@ -56,7 +56,7 @@ class SEP(BaseBank):
             token = response_json["token"]
             self._set_reference_number(token)
         else:
-            logging.critical("SEP gateway reject payment")
+            logger.critical("SEP gateway reject payment")
             raise BankGatewayRejectPayment(self.get_transaction_status_text())
 
     """
@@ -92,6 +92,8 @@ class SEP(BaseBank):
         self._set_tracking_code(tracking_code)
         self._set_reference_number(ref_num)
 
+        if not await self._acquire_verify_lease():
+            return
         await self._set_bank_record()
 
         token = form.get("Token", None)
@@ -105,10 +107,7 @@ class SEP(BaseBank):
 
     
 
-            await MongoCrud.update_one_set(
-                self._db, Bank,
-                {Bank.id: self._bank.id},
-                self._bank)
+            await self._save_bank_record()
         else:
             await self._set_payment_status(PaymentStatus.CANCEL_BY_USER)
 
@@ -131,26 +130,44 @@ class SEP(BaseBank):
         await super(SEP, self).prepare_verify(tracking_code)
 
     async def verify(self, transaction_code):
-        await super(SEP, self).verify(transaction_code)
-        data = self.get_verify_data()
-        result = await self._send_data(self._verify_api_url, data)
-        if result['ResultCode'] == 0:
-            await self._set_payment_status(PaymentStatus.COMPLETE)
-        else:
-            await self._set_payment_status(PaymentStatus.CANCEL_BY_USER)
-            logging.debug("SEP gateway unapprove payment")
+        async with lifecycle.operation("verify"):
+            with self._span("bank.verify") as span:
+                await super(SEP, self).verify(transaction_code)
+                span.set_tracking_code(self.get_tracking_code())
+                data = self.get_verify_data()
+                result = await self._send_data(self._verify_api_url, data)
+                span.set_attribute("result_code", result['ResultCode'])
+                if result['ResultCode'] == 0:
+                    await self._set_payment_status(PaymentStatus.COMPLETE)
+                else:
+                    await self._set_payment_status(PaymentStatus.CANCEL_BY_USER)
+                    logger.debug("SEP gateway unapprove payment")
+
+    def get_warmup_urls(self):
+        return [self._token_api_url, self._verify_api_url]
+
+    async def _post(self, client, api, data, span):
+        async with client.post(api, json=data, timeout=5) as response:
+            span.set_attribute("http_status", response.status)
+            if settings.FAST_SERIALIZATION:
+                return json_loads(await response.read())
+            return await response.json()
 
     async def _send_data(self, api, data):
         try:
-            async with aiohttp.ClientSession() as client:
-                async with client.post(api, json=data, timeout=5) as response:
-                    response_json = await response.json()
+            with self._span("gateway.request", api=api) as span:
+                session = lifecycle.get_session()
+                if session is not None:
+                    response_json = await self._post(session, api, data, span)
+                else:
+                    async with aiohttp.ClientSession() as client:
+                        response_json = await self._post(client, api, data, span)
 
         except ServerTimeoutError:
-            logging.exception("SEP time out gateway {}".format(data))
+            logger.exception("SEP time out gateway", api=api, data=data)
             raise BankGatewayConnectionError()
         except ClientConnectionError:
-            logging.exception("SEP time out gateway {}".format(data))
+            logger.exception("SEP time out gateway", api=api, data=data)
             raise BankGatewayConnectionError()
 
         self._set_transaction_status_text(response_json.get("errorDesc"))
@@ -0,0 +1,217 @@
+"""
+Benchmarks of the pure-Python code which runs on every payment.
+
+Each case gets the mounted package loader and returns the zero argument
+callable to time.
+"""
+import json
+import logging
+
+from stubs import Mongo, load
+
+CASES = {}
+
+BANK_FIELDS = {
+    "_id": "5f1d7f9a2c3b4a5d6e7f8091",
+    "status": "Waiting",
+    "bank_type": "SEP",
+    "tracking_code": "5f1d7f9a2c3b4a5d6e7f8091",
+    "amount": "150000",
+    "reference_number": "GmshtyjwKSu5lsiadRZZxRcn0fyBGFRXcM9OORX1pP",
+    "response_result": "",
+    "callback_url": "https://bench.local/order/1/",
+    "phone": "09120000000",
+    "col_name": "order",
+    "col_obj": {"order_id": 1, "items": [1, 2, 3], "user": {"id": 7}},
+    "created_at": 1600000000,
+}
+
+
+def benchmark(name):
+    def decorator(func):
+        CASES[name] = func
+        return func
+    return decorator
+
+
+def _sep(currency="IRR"):
+    factory = load("bankfactories").BankFactory()
+    bank = factory.create(db=Mongo(), bank_type="SEP")
+    bank.set_currency(currency)
+    bank.set_amount(150000)
+    bank.set_mobile_number("09120000000")
+    bank._set_tracking_code(BANK_FIELDS["tracking_code"])
+    bank._set_reference_number(BANK_FIELDS["reference_number"])
+    return bank
+
+
+@benchmark("prepare_amount_same_currency")
+def prepare_amount_same_currency():
+    return _sep("IRR").prepare_amount
+
+
+@benchmark("prepare_amount_toman_to_rial")
+def prepare_amount_toman_to_rial():
+    return _sep("IRT").prepare_amount
+
+
+@benchmark("rial_to_toman")
+def rial_to_toman():
+    currency = load("models").CurrencyEnum
+    return lambda: currency.rial_to_toman(150000)
+
+
+@benchmark("append_querystring")
+def append_querystring():
+    func = load("utils").append_querystring
+    params = {"Token": BANK_FIELDS["reference_number"], "GetMethod": "true"}
+    return lambda: func("https://sep.shaparak.ir/OnlinePG/SendToken?lang=fa", params)
+
+
+@benchmark("bank_model_construct")
+def bank_model_construct():
+    bank = load("models").Bank
+    return lambda: bank(**BANK_FIELDS)
+
+
+@benchmark("bank_model_dict")
+def bank_model_dict():
+    bank = load("models").Bank(**BANK_FIELDS)
+    return bank.dict
+
+
+@benchmark("sep_get_pay_data")
+def sep_get_pay_data():
+    bank = _sep()
+    bank.prepare_amount()
+    return bank.get_pay_data
+
+
+@benchmark("sep_get_verify_data")
+def sep_get_verify_data():
+    return _sep().get_verify_data
+
+
+@benchmark("bank_factory_create")
+def bank_factory_create():
+    factory = load("bankfactories").BankFactory()
+    db = Mongo()
+    return lambda: factory.create(db=db, bank_type="SEP")
+
+
+@benchmark("bank_to_document")
+def bank_to_document():
+    bank = load("models").Bank(**BANK_FIELDS)
+    return bank.to_document
+
+
+@benchmark("bank_from_document")
+def bank_from_document():
+    bank = load("models").Bank
+    return lambda: bank.from_document(BANK_FIELDS)
+
+
+RESPONSE_BODY = json.dumps({
+    "status": 1,
+    "token": BANK_FIELDS["reference_number"],
+    "errorCode": None,
+    "errorDesc": None,
+    "ResultCode": 0,
+    "ResultDescription": "عملیات با موفقیت انجام شد",
+}).encode("utf-8")
+
+
+@benchmark("response_json_stdlib")
+def response_json_stdlib():
+    # what aiohttp's response.json() does with the body
+    return lambda: json.loads(RESPONSE_BODY.decode("utf-8"))
+
+
+@benchmark("response_json_fast")
+def response_json_fast():
+    json_loads = load("utils").json_loads
+    return lambda: json_loads(RESPONSE_BODY)
+
+
+def _span_case(enabled):
+    tracing = load("tracing")
+    tracer = tracing.Tracer(enabled=enabled, sample_rate=1.0, sink=tracing.InMemorySink())
+
+    def run():
+        with tracer.span("db.save_bank", BANK_FIELDS["tracking_code"], status="Waiting"):
+            pass
+    if enabled:
+        return lambda: (run(), tracer.sink.clear())
+    return run
+
+
+@benchmark("tracing_span_disabled")
+def tracing_span_disabled():
+    return _span_case(False)
+
+
+@benchmark("tracing_span_enabled")
+def tracing_span_enabled():
+    return _span_case(True)
+
+
+PAY_DATA = {
+    "Action": "Token",
+    "Amount": 150000,
+    "TerminalId": "123456",
+    "ResNum": BANK_FIELDS["tracking_code"],
+    "CellNumber": BANK_FIELDS["phone"],
+}
+
+
+def _loggers(level):
+    handler = logging.NullHandler()
+    loggers = []
+    for name in ("bench.stdlib", "bench.structured"):
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.propagate = False
+        logger.setLevel(level)
+        loggers.append(logger)
+    return loggers[0], load("logger").StructuredLogger("bench.structured")
+
+
+def _stdlib_case(level):
+    stdlib, _ = _loggers(level)
+
+    def run():
+        # the per request calls of the status change and gateway paths
+        stdlib.debug("Change bank payment status", extra={"status": "Waiting"})
+        stdlib.debug("Request create bank", extra={"bank_type": "SEP"})
+        stdlib.debug("SEP time out gateway {}".format(PAY_DATA))
+    return run
+
+
+def _structured_case(level):
+    _, structured = _loggers(level)
+
+    def run():
+        structured.debug("Change bank payment status", status="Waiting")
+        structured.debug("Request create bank", bank_type="SEP")
+        structured.debug("SEP time out gateway", data=PAY_DATA)
+    return run
+
+
+@benchmark("logging_stdlib_disabled")
+def logging_stdlib_disabled():
+    return _stdlib_case(logging.INFO)
+
+
+@benchmark("logging_structured_disabled")
+def logging_structured_disabled():
+    return _structured_case(logging.INFO)
+
+
+@benchmark("logging_stdlib_enabled")
+def logging_stdlib_enabled():
+    return _stdlib_case(logging.DEBUG)
+
+
+@benchmark("logging_structured_enabled")
+def logging_structured_enabled():
+    return _structured_case(logging.DEBUG)
@@ -0,0 +1,122 @@
+"""
+Run the hot path benchmarks and compare them with the recorded baseline.
+
+    python benchmarks/run.py                  # compare with baseline.json
+    python benchmarks/run.py --save           # record the cases missing a baseline
+    python benchmarks/run.py --save --update  # re-record every case
+    python benchmarks/run.py -k sep_          # only matching cases
+
+Run it as a script, not with ``-m``: the package root contains a
+``types.py`` which must not shadow the standard library module.
+
+Every case is timed as the median of ``--repeat`` runs. A case slower than
+its baseline by more than its threshold is measured again ``--confirm``
+times and only counts as a regression when every measurement is too slow,
+a single noisy run does not fail the gate. The exit code is 1 when there
+is a regression. Baselines are machine dependent, record them on the
+machine which runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+from cases import CASES
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+
+def measure(func, repeat: int) -> float:
+    """:return: median time of one call in nanoseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return statistics.median(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def read_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_baseline(path: str, results: dict, previous: dict):
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "thresholds": previous.get("thresholds", {}),
+        "results": {name: round(value, 1) for name, value in results.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", dest="filter", default="",
+                        help="only run cases containing this text")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true",
+                        help="add the results of cases without a baseline")
+    parser.add_argument("--update", action="store_true",
+                        help="with --save, also overwrite existing baselines")
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="re-runs a slower case needs to fail to be a regression")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="allowed slowdown ratio for every case, e.g. 0.25")
+    args = parser.parse_args(argv)
+
+    baseline = read_baseline(args.baseline)
+    thresholds = baseline.get("thresholds", {})
+    expected = baseline.get("results", {})
+
+    results = {}
+    regressions = []
+    print(f"{'case':<36}{'ns/op':>12}{'baseline':>12}{'change':>9}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        func = setup()
+        results[name] = measure(func, args.repeat)
+
+        line = ""
+        if name in expected:
+            threshold = args.threshold
+            if threshold is None:
+                threshold = thresholds.get(name, DEFAULT_THRESHOLD)
+            limit = expected[name] * (1 + threshold)
+            for _ in range(args.confirm):
+                if results[name] <= limit:
+                    break
+                # keep the fastest run, noise only ever slows a case down
+                results[name] = min(results[name], measure(func, args.repeat))
+            change = results[name] / expected[name] - 1
+            line = f"{expected[name]:>12.1f}{change:>+9.1%}"
+            if results[name] > limit:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(f"{name:<36}{results[name]:>12.1f}{line}")
+
+    if args.save:
+        if args.update:
+            results = {**expected, **results}
+        else:
+            results = {**results, **expected}
+        write_baseline(args.baseline, results, baseline)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
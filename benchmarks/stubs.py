@@ -0,0 +1,115 @@
+"""
+Offline stand-ins for the host project modules this package imports
+(``db.mongo``, ``common.utiles`` and ``config``), plus the helper mounting
+the package under its usual ``engines.iranian_bank_gateways`` name.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import time
+import types
+import uuid
+
+from pydantic.main import ModelMetaclass
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "engines.iranian_bank_gateways"
+CALLBACK_URL = "https://bench.local"
+
+
+class Tables:
+    transaction = "transaction"
+
+
+class SetEnum(ModelMetaclass):
+    """``Model.field`` resolves to the field's mongo name, like the host project"""
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        cls.DoesNotExist = type("DoesNotExist", (Exception,), {})
+        return cls
+
+    def __getattr__(cls, name):
+        fields = cls.__dict__.get("__fields__", {})
+        if name in fields:
+            return fields[name].alias
+        raise AttributeError(name)
+
+
+class PyObjectId(str):
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value):
+        return cls(value)
+
+
+def create_objectid():
+    return PyObjectId(uuid.uuid4().hex[:24])
+
+
+class Mongo:
+    """Placeholder database for the benchmarks, which never reach mongo"""
+
+
+class MongoCrud:
+    """Same calls as the host project, on a motor database such as mongomock-motor"""
+
+    @staticmethod
+    async def find_one(db, model, query):
+        document = await db[model.Config.collection].find_one(query)
+        if document is None:
+            raise model.DoesNotExist()
+        return model(**document)
+
+    @staticmethod
+    async def update_one_set(db, model, query, obj, upsert=False):
+        document = obj.dict(by_alias=True, exclude={"id"})
+        await db[model.Config.collection].update_one(
+            query, {"$set": document}, upsert=upsert)
+
+
+def utctimestampnow():
+    return int(time.time())
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """Register the stubs and mount the package, return its import name"""
+    if PACKAGE in sys.modules:
+        return PACKAGE
+
+    _module("db", __path__=[])
+    _module("db.mongo", Tables=Tables, SetEnum=SetEnum, PyObjectId=PyObjectId,
+            create_objectid=create_objectid, Mongo=Mongo, MongoCrud=MongoCrud)
+    _module("common", __path__=[])
+    _module("common.utiles", utctimestampnow=utctimestampnow)
+    _module("config", settings=types.SimpleNamespace())
+
+    _module("engines", __path__=[])
+    _module(PACKAGE, __path__=[ROOT], __package__=PACKAGE)
+
+    # default_settings expects the host project to provide ``url``
+    name = f"{PACKAGE}.default_settings"
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(ROOT, "default_settings.py"))
+    module = importlib.util.module_from_spec(spec)
+    module.url = CALLBACK_URL
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    return PACKAGE
+
+
+def load(name):
+    """import a module of the mounted package"""
+    return importlib.import_module(f"{install()}.{name}")
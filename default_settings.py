@@ -29,6 +29,43 @@ class BanksSettings(BaseSettings):
     CURRENCY = "IRT"
     CALLBACK_NAMESPACE = f"{url}/payment/receive"
 
+    # Terminal records older than this (seconds) move to the cold collection
+    ARCHIVE_COLLECTION = "transaction_archive"
+    ARCHIVE_AFTER_SECONDS = 30 * 24 * 60 * 60
+    ARCHIVE_BATCH_SIZE = 500
+
+    # Per gateway counters, updated on every payment status change
+    STATS_ENABLED = True
+    STATS_COLLECTION = "transaction_stats"
+    STATS_BUCKET_SECONDS = 60 * 60
+
+    # Skip pydantic validation for records written by this package and
+    # decode gateway responses from raw bytes (with orjson when installed)
+    FAST_SERIALIZATION = False
+
+    # Spans keyed by tracking code, see tracing.py
+    TRACING_ENABLED = False
+    TRACING_SAMPLE_RATE = 1.0
+    TRACING_SINK_CLASS = f"{iranian_bank_gateways}.tracing.InMemorySink"
+    TRACING_JSONL_PATH = "payment_spans.jsonl"
+    TRACING_MEMORY_MAX_SPANS = 10000
+
+    # Only the verify lease owner verifies a payment, other workers wait
+    # for its result; 0 returns the current status immediately
+    VERIFY_LEASE_SECONDS = 30
+    VERIFY_LEASE_WAIT_SECONDS = 10
+    VERIFY_LEASE_POLL_SECONDS = 0.2
+
+    # Connection warm up and graceful drain, see lifecycle.py
+    GATEWAY_KEEPALIVE_SECONDS = 60
+    GATEWAY_WARMUP_TIMEOUT = 5
+    LIFECYCLE_DRAIN_SECONDS = 25
+    LIFECYCLE_ABORT_GRACE_SECONDS = 5
+
+    # Structured logging, see logger.py; event -> share of records kept
+    LOG_SAMPLE_RATES = {}
+    LOG_REDACTED_FIELDS = ["CellNumber", "SecurePan", "secure_pan", "phone"]
+
 
 @lru_cache()
 def get_settings() -> BanksSettings:
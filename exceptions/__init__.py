@@ -2,6 +2,7 @@ from .exceptions import (  # noqa
     AmountDoesNotSupport,
     AZBankGatewaysException,
     BankGatewayConnectionError,
+    BankGatewayShuttingDown,
     BankGatewayStateInvalid,
     BankGatewayTokenExpired,
     BankGatewayUnclear,
@@ -36,3 +36,7 @@ class BankGatewayStateInvalid(AZBankGatewaysException):
 
 class BankGatewayAutoConnectionFailed(AZBankGatewaysException):
     """The auto connection cant find bank"""
+
+
+class BankGatewayShuttingDown(AZBankGatewaysException):
+    """The payment operation started while the gateways shut down"""
@@ -0,0 +1,88 @@
+"""
+Verify lease stored on the bank document.
+
+Duplicate gateway callbacks for one payment may reach different workers.
+The worker holding the lease verifies the payment, the others wait for its
+result. The lease fields are not part of the Bank model, so saving the
+model never overwrites them.
+"""
+import asyncio
+import os
+import socket
+import uuid
+
+from common.utiles import utctimestampnow
+
+from .default_settings import settings
+from .models import Bank, PaymentStatus
+from .utils import get_collection
+
+LEASE_OWNER = "lease_owner"
+LEASE_EXPIRES_AT = "lease_expires_at"
+
+
+def _bank_collection(db):
+    return get_collection(db, Bank.Config.collection)
+
+
+def new_lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+async def acquire_verify_lease(db, tracking_code: str, owner: str, ttl: int = None) -> bool:
+    """Take the lease if it is free, expired or already ours"""
+    now = utctimestampnow()
+    result = await _bank_collection(db).update_one(
+        {
+            Bank.tracking_code: tracking_code,
+            "$or": [
+                {LEASE_OWNER: None},
+                {LEASE_EXPIRES_AT: {"$lt": now}},
+                {LEASE_OWNER: owner},
+            ],
+        },
+        {"$set": {
+            LEASE_OWNER: owner,
+            LEASE_EXPIRES_AT: now + (ttl or settings.VERIFY_LEASE_SECONDS),
+        }},
+    )
+    return result.matched_count == 1
+
+
+async def renew_verify_lease(db, tracking_code: str, owner: str, ttl: int = None) -> bool:
+    """Extend our lease, False when it expired and another owner took it"""
+    result = await _bank_collection(db).update_one(
+        {Bank.tracking_code: tracking_code, LEASE_OWNER: owner},
+        {"$set": {
+            LEASE_EXPIRES_AT: utctimestampnow() + (ttl or settings.VERIFY_LEASE_SECONDS),
+        }},
+    )
+    return result.matched_count == 1
+
+
+async def release_verify_lease(db, tracking_code: str, owner: str) -> bool:
+    result = await _bank_collection(db).update_one(
+        {Bank.tracking_code: tracking_code, LEASE_OWNER: owner},
+        {"$unset": {LEASE_OWNER: "", LEASE_EXPIRES_AT: ""}},
+    )
+    return result.matched_count == 1
+
+
+async def wait_for_verify_result(db, tracking_code: str, timeout: float = None):
+    """Wait until the lease owner finished verifying, at most timeout seconds"""
+    if timeout is None:
+        timeout = settings.VERIFY_LEASE_WAIT_SECONDS
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        document = await _bank_collection(db).find_one(
+            {Bank.tracking_code: tracking_code},
+            {Bank.status: 1, LEASE_OWNER: 1, LEASE_EXPIRES_AT: 1},
+        )
+        if document is None or not document.get(LEASE_OWNER):
+            return
+        if document.get(LEASE_EXPIRES_AT, 0) < utctimestampnow():
+            return
+        if document.get(Bank.status) in PaymentStatus.terminal():
+            return
+        await asyncio.sleep(settings.VERIFY_LEASE_POLL_SECONDS)
@@ -0,0 +1,162 @@
+"""
+Startup and shutdown of the payment gateways in a worker.
+
+    await lifecycle.startup(db)     # on application startup
+    await lifecycle.shutdown()      # on application shutdown
+
+Startup pings mongo and opens keep-alive connections to every configured
+gateway through a shared session, which the banks use while it is open.
+Shutdown stops accepting new payment operations and waits for the running
+ones until the drain deadline, the rest are cancelled and awaited. Pending
+stats updates and spans are written before the session closes.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+from aiohttp.client_exceptions import ClientError
+from pydantic import BaseModel
+
+from .default_settings import settings
+from .exceptions import BankGatewayShuttingDown
+from .logger import logger
+from .stats import wait_pending_stats
+from .tracing import tracer
+
+
+class LifecycleMetrics(BaseModel):
+    warmup_seconds: float = 0
+    mongo_ping_seconds: float = 0
+    warmed_gateways: int = 0
+    failed_gateways: int = 0
+    in_flight: int = 0
+    drained: int = 0
+    aborted: int = 0
+
+
+class PaymentLifecycle:
+    def __init__(self, bank_factory=None):
+        self._bank_factory = bank_factory
+        self._session: aiohttp.ClientSession = None
+        self._operations = {}
+        self._aborted = set()
+        self._idle = None
+        self._draining = False
+        self.metrics = LifecycleMetrics()
+
+    @property
+    def bank_factory(self):
+        if self._bank_factory is None:
+            # imported here, the banks import this module
+            from .bankfactories import BankFactory
+
+            self._bank_factory = BankFactory()
+        return self._bank_factory
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """shared gateway session, None outside startup/shutdown"""
+        if self._session is None or self._session.closed:
+            return None
+        return self._session
+
+    async def startup(self, db, bank_types: list = None) -> LifecycleMetrics:
+        started = time.perf_counter()
+        self._draining = False
+        self._aborted = set()
+
+        await db.command("ping")
+        self.metrics.mongo_ping_seconds = time.perf_counter() - started
+
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            keepalive_timeout=settings.GATEWAY_KEEPALIVE_SECONDS,
+        ))
+        if bank_types is None:
+            bank_types = self.bank_factory.get_bank_priorities()
+        warmups = []
+        for bank_type in bank_types:
+            bank = self.bank_factory.create(db=db, bank_type=bank_type)
+            warmups += [self._warmup(bank_type, url) for url in bank.get_warmup_urls()]
+        await asyncio.gather(*warmups)
+
+        self.metrics.warmup_seconds = time.perf_counter() - started
+        logger.debug("Payment gateways warmed up", metrics=self.metrics.dict)
+        return self.metrics
+
+    async def _warmup(self, bank_type, url):
+        try:
+            async with self._session.head(
+                    url, allow_redirects=False,
+                    timeout=settings.GATEWAY_WARMUP_TIMEOUT):
+                pass
+            self.metrics.warmed_gateways += 1
+        except (ClientError, asyncio.TimeoutError):
+            self.metrics.failed_gateways += 1
+            logger.exception("Gateway warm up failed",
+                             bank_type=bank_type, url=url)
+
+    @asynccontextmanager
+    async def operation(self, name: str):
+        """Track a payment operation of the current task, nested calls count once"""
+        task = asyncio.current_task()
+        if task in self._operations:
+            yield
+            return
+        if self._draining:
+            raise BankGatewayShuttingDown(f"Can not start {name}, shutting down")
+
+        self._operations[task] = name
+        self.metrics.in_flight = len(self._operations)
+        try:
+            yield
+        finally:
+            del self._operations[task]
+            self.metrics.in_flight = len(self._operations)
+            if self._draining:
+                if task not in self._aborted:
+                    self.metrics.drained += 1
+                if not self._operations:
+                    self._idle.set()
+
+    async def _abort(self):
+        """cancel the operations left after the drain deadline and wait for them"""
+        tasks = []
+        for task, name in list(self._operations.items()):
+            logger.critical("Abort payment operation on shutdown", operation=name)
+            self._aborted.add(task)
+            task.cancel()
+            tasks.append(task)
+        self.metrics.aborted += len(tasks)
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*tasks, return_exceptions=True),
+                settings.LIFECYCLE_ABORT_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.critical("Payment operations ignored cancellation",
+                            count=len(self._operations))
+
+    async def shutdown(self, timeout: float = None) -> LifecycleMetrics:
+        if timeout is None:
+            timeout = settings.LIFECYCLE_DRAIN_SECONDS
+        self._draining = True
+        self._idle = asyncio.Event()
+        if not self._operations:
+            self._idle.set()
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self._abort()
+
+        await wait_pending_stats()
+        await asyncio.get_running_loop().run_in_executor(
+            None, tracer.flush, settings.LIFECYCLE_ABORT_GRACE_SECONDS)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        logger.debug("Payment gateways drained", metrics=self.metrics.dict)
+        return self.metrics
+
+
+lifecycle = PaymentLifecycle()
@@ -0,0 +1,98 @@
+"""
+Structured logging for the package.
+
+    logger.debug("Change bank payment status", status=lambda: bank.status)
+
+The level is checked before anything else, callable field values are only
+evaluated for records which are emitted, events listed in LOG_SAMPLE_RATES
+are sampled and fields named in LOG_REDACTED_FIELDS are masked, also
+inside nested dicts such as gateway payloads. Fields become attributes of
+the log record, like ``extra``.
+"""
+import logging
+import random
+
+from .default_settings import settings
+
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def redact(value):
+    """keep the last four characters"""
+    value = str(value)
+    return "*" * max(len(value) - 4, 0) + value[-4:]
+
+
+def _prepare(value, redacted_fields):
+    """
+    Evaluate callables and redact fields, in nested dicts, lists and tuples
+    too. Values without anything to change are returned as they are, like
+    any other object.
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in redacted_fields or callable(item) or isinstance(item, _CONTAINERS):
+                break
+        else:
+            return value
+        prepared = {}
+        for key, item in value.items():
+            if callable(item):
+                item = item()
+            if key in redacted_fields and item is not None:
+                item = redact(item)
+            elif isinstance(item, _CONTAINERS):
+                item = _prepare(item, redacted_fields)
+            prepared[key] = item
+        return prepared
+    if isinstance(value, list):
+        return [_prepare(item, redacted_fields) for item in value]
+    if type(value) is tuple:
+        # tuple subclasses such as named tuples are logged as they are
+        return tuple(_prepare(item, redacted_fields) for item in value)
+    return value
+
+
+class StructuredLogger:
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def is_sampled(self, event: str) -> bool:
+        rate = settings.LOG_SAMPLE_RATES.get(event)
+        return rate is None or random.random() < rate
+
+    def _emit(self, level: int, event: str, fields: dict, exc_info=False):
+        """the public methods check the level, this only runs for enabled records"""
+        if not self.is_sampled(event):
+            return
+        # stacklevel 3 reports the caller of the public method, not this module
+        self._logger.log(level, event, exc_info=exc_info, stacklevel=3,
+                         extra=_prepare(fields, settings.LOG_REDACTED_FIELDS))
+
+    def log(self, level: int, event: str, exc_info=False, **fields):
+        if self._logger.isEnabledFor(level):
+            self._emit(level, event, fields, exc_info)
+
+    def debug(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._emit(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, event, fields)
+
+    def critical(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.CRITICAL):
+            self._emit(logging.CRITICAL, event, fields)
+
+    def exception(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, event, fields, exc_info=True)
+
+
+logger = StructuredLogger(__package__)
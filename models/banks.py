@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import BaseModel, Field
 
 from common.utiles import utctimestampnow
@@ -31,3 +33,38 @@ class Bank(BaseModel, metaclass=SetEnum):
     @property
     def is_success(self):
         return self.status == PaymentStatus.COMPLETE
+
+    def to_document(self) -> dict:
+        """
+        Compact mongo document of the record, None fields are left out.
+        Unlike dict(), values are neither copied nor converted, only use it
+        for records this package built itself.
+        """
+        aliases = _field_aliases(type(self))
+        return {
+            aliases[name]: value
+            for name, value in self.__dict__.items()
+            if value is not None and name in aliases
+        }
+
+    @classmethod
+    def from_document(cls, document: dict) -> "Bank":
+        """Build the record from a stored mongo document without validation"""
+        values = {}
+        fields_set = set()
+        for name, field in cls.__fields__.items():
+            if field.alias in document:
+                values[name] = document[field.alias]
+                fields_set.add(name)
+            else:
+                values[name] = field.get_default()
+        # same as construct(), minus its per call keyword and alias handling
+        bank = cls.__new__(cls)
+        object.__setattr__(bank, "__dict__", values)
+        object.__setattr__(bank, "__fields_set__", fields_set)
+        return bank
+
+
+@lru_cache()
+def _field_aliases(model) -> dict:
+    return {name: field.alias for name, field in model.__fields__.items()}
@@ -28,3 +28,14 @@ class PaymentStatus(str, Enum):
     EXPIRE_VERIFY_PAYMENT = "Expire verify payment"
     COMPLETE = "Complete"
     ERROR = "Unknown error acquired"
+
+    @classmethod
+    def terminal(cls):
+        """statuses after which the record never changes again"""
+        return [
+            cls.CANCEL_BY_USER,
+            cls.EXPIRE_GATEWAY_TOKEN,
+            cls.EXPIRE_VERIFY_PAYMENT,
+            cls.COMPLETE,
+            cls.ERROR,
+        ]
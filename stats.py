@@ -0,0 +1,121 @@
+import asyncio
+import typing
+
+from common.utiles import utctimestampnow
+from pydantic import BaseModel
+
+from .default_settings import settings
+from .logger import logger
+from .models import Bank, PaymentStatus
+from .utils import get_collection
+
+
+class GatewayStats(BaseModel):
+    bank_type: str
+    bucket: int
+    counts: typing.Dict[str, int] = {}
+    amounts: typing.Dict[str, int] = {}
+
+    @property
+    def started(self) -> int:
+        """payments which reached the gateway"""
+        return self.counts.get(PaymentStatus.WAITING, 0)
+
+    @property
+    def completed(self) -> int:
+        return self.counts.get(PaymentStatus.COMPLETE, 0)
+
+    @property
+    def volume(self) -> int:
+        """sum of completed amounts"""
+        return self.amounts.get(PaymentStatus.COMPLETE, 0)
+
+    @property
+    def success_rate(self) -> float:
+        if not self.started:
+            return 0.0
+        return self.completed / self.started
+
+    @property
+    def average_amount(self) -> float:
+        if not self.completed:
+            return 0.0
+        return self.volume / self.completed
+
+
+_pending = set()
+
+
+def _stats_collection(db):
+    return get_collection(db, settings.STATS_COLLECTION)
+
+
+def get_bucket(timestamp: int) -> int:
+    return timestamp - timestamp % settings.STATS_BUCKET_SECONDS
+
+
+async def record_status_change(db, bank: Bank):
+    """
+    Count the bank record's current status in the time window the payment
+    was created in, so all statuses of one payment share a window.
+    """
+    if not settings.STATS_ENABLED:
+        return
+    bucket = get_bucket(bank.created_at or utctimestampnow())
+    try:
+        await _stats_collection(db).update_one(
+            {
+                "_id": f"{bank.bank_type}:{bucket}:{bank.status}",
+                "bank_type": bank.bank_type,
+                "bucket": bucket,
+                "status": bank.status,
+            },
+            {"$inc": {"count": 1, "amount": int(bank.amount or 0)}},
+            upsert=True,
+        )
+    except Exception:
+        # counters must never fail a payment
+        logger.exception("Update gateway stats failed",
+                         bank_type=bank.bank_type)
+
+
+def schedule_status_change(db, bank: Bank):
+    """Update the counters in the background, the payment does not wait"""
+    if not settings.STATS_ENABLED:
+        return
+    # the record keeps changing, count a copy of its current state
+    task = asyncio.ensure_future(record_status_change(db, bank.copy()))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def wait_pending_stats():
+    """Wait for the scheduled counter updates, e.g. before shutdown"""
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+
+
+async def get_gateway_stats(db, bank_type: str = None, since: int = None,
+                            until: int = None) -> typing.List[GatewayStats]:
+    """
+    :return: one entry per gateway and time window, oldest first.
+    """
+    query = {}
+    if bank_type:
+        query["bank_type"] = bank_type
+    if since is not None or until is not None:
+        query["bucket"] = {}
+        if since is not None:
+            query["bucket"]["$gte"] = get_bucket(since)
+        if until is not None:
+            query["bucket"]["$lte"] = until
+
+    result = {}
+    async for counter in _stats_collection(db).find(query):
+        key = (counter["bank_type"], counter["bucket"])
+        if key not in result:
+            result[key] = GatewayStats(bank_type=key[0], bucket=key[1])
+        result[key].counts[counter["status"]] = counter["count"]
+        result[key].amounts[counter["status"]] = counter["amount"]
+
+    return [result[key] for key in sorted(result)]
@@ -0,0 +1,79 @@
+"""
+The tests run against the offline host stubs of the benchmarks and an in
+memory mongo (mongomock-motor). Run them from outside the package root, the
+root ``types.py`` must not shadow the standard library module:
+
+    cd /tmp && python -m pytest /path/to/package/tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from stubs import load  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """run a coroutine to completion in a new event loop"""
+    return asyncio.run
+
+
+@pytest.fixture
+def db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["iranian_bank_gateways"]
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """package settings, changes are undone after the test"""
+    settings = load("default_settings").settings
+
+    class Settings:
+        def __getattr__(self, name):
+            return getattr(settings, name)
+
+        def __setattr__(self, name, value):
+            monkeypatch.setattr(settings, name, value)
+
+    return Settings()
+
+
+@pytest.fixture
+def insert_bank(db, run):
+    """store a bank record straight in the transaction collection"""
+    status = load("models").PaymentStatus
+
+    def insert(tracking_code, **fields):
+        document = {
+            "_id": tracking_code,
+            "tracking_code": tracking_code,
+            "status": status.REDIRECT_TO_BANK,
+            "amount": "20000",
+            "created_at": int(time.time()),
+            **fields,
+        }
+        run(db["transaction"].insert_one(document))
+        return document
+
+    return insert
+
+
+@pytest.fixture
+def gateway_calls(monkeypatch):
+    """SEP requests, answered successfully without the network"""
+    calls = []
+
+    async def send_data(self, api, data):
+        calls.append(api)
+        await asyncio.sleep(0.05)
+        return {"status": 1, "token": "token", "ResultCode": 0}
+
+    monkeypatch.setattr(load("banks.sep").SEP, "_send_data", send_data)
+    return calls
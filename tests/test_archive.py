@@ -0,0 +1,34 @@
+from stubs import load
+
+archive = load("archive")
+PaymentStatus = load("models").PaymentStatus
+
+
+def test_archive_moves_old_terminal_records(db, run, insert_bank):
+    insert_bank("old-complete", status=PaymentStatus.COMPLETE, created_at=0)
+    insert_bank("old-cancel", status=PaymentStatus.CANCEL_BY_USER, created_at=0)
+    insert_bank("old-waiting", status=PaymentStatus.WAITING, created_at=0)
+    insert_bank("new-complete", status=PaymentStatus.COMPLETE, created_at=2 ** 40)
+
+    assert run(archive.archive_transactions(db, older_than=60, batch_size=1)) == 2
+
+    hot = run(db["transaction"].distinct("_id"))
+    cold = run(db["transaction_archive"].distinct("_id"))
+    assert sorted(hot) == ["new-complete", "old-waiting"]
+    assert sorted(cold) == ["old-cancel", "old-complete"]
+
+
+def test_archive_creates_indexes(db, run):
+    run(archive.archive_transactions(db))
+
+    assert "status_1_created_at_1" in run(db["transaction"].index_information())
+    assert "tracking_code_1" in run(db["transaction_archive"].index_information())
+
+
+def test_find_archived(db, run, insert_bank):
+    insert_bank("old-complete", status=PaymentStatus.COMPLETE, created_at=0)
+    run(archive.archive_transactions(db, older_than=60))
+
+    bank = run(archive.find_archived(db, "old-complete"))
+
+    assert bank.status == PaymentStatus.COMPLETE
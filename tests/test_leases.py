@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from stubs import load
+
+leases = load("leases")
+PaymentStatus = load("models").PaymentStatus
+
+TRACKING_CODE = "5f1d7f9a2c3b4a5d6e7f8091"
+
+
+@pytest.fixture
+def find_bank(db, run):
+    return lambda: run(db["transaction"].find_one({"_id": TRACKING_CODE}))
+
+
+def test_acquire_only_once(db, run, insert_bank, find_bank):
+    insert_bank(TRACKING_CODE)
+
+    assert run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+    assert not run(leases.acquire_verify_lease(db, TRACKING_CODE, "second"))
+    # the owner can take it again
+    assert run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+    assert find_bank()[leases.LEASE_OWNER] == "first"
+
+
+def test_acquire_expired_lease(db, run, insert_bank, find_bank):
+    insert_bank(TRACKING_CODE, lease_owner="crashed", lease_expires_at=0)
+
+    assert run(leases.acquire_verify_lease(db, TRACKING_CODE, "second"))
+    assert find_bank()[leases.LEASE_OWNER] == "second"
+
+
+def test_acquire_missing_record(db, run):
+    assert not run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+
+
+def test_renew_only_by_owner(db, run, insert_bank, find_bank):
+    insert_bank(TRACKING_CODE)
+    run(leases.acquire_verify_lease(db, TRACKING_CODE, "first", ttl=1))
+    expires_at = find_bank()[leases.LEASE_EXPIRES_AT]
+
+    assert not run(leases.renew_verify_lease(db, TRACKING_CODE, "second", ttl=60))
+    assert run(leases.renew_verify_lease(db, TRACKING_CODE, "first", ttl=60))
+    assert find_bank()[leases.LEASE_EXPIRES_AT] > expires_at
+
+
+def test_release_frees_the_lease(db, run, insert_bank, find_bank):
+    insert_bank(TRACKING_CODE)
+    run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+
+    assert not run(leases.release_verify_lease(db, TRACKING_CODE, "second"))
+    assert run(leases.release_verify_lease(db, TRACKING_CODE, "first"))
+    assert leases.LEASE_OWNER not in find_bank()
+    assert run(leases.acquire_verify_lease(db, TRACKING_CODE, "second"))
+
+
+def test_wait_until_owner_releases(db, run, settings, insert_bank, find_bank):
+    settings.VERIFY_LEASE_POLL_SECONDS = 0.01
+    insert_bank(TRACKING_CODE)
+    run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+
+    async def owner():
+        await asyncio.sleep(0.05)
+        await db["transaction"].update_one(
+            {"_id": TRACKING_CODE}, {"$set": {"status": PaymentStatus.COMPLETE}})
+        await leases.release_verify_lease(db, TRACKING_CODE, "first")
+
+    async def waiter():
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(
+            owner(), leases.wait_for_verify_result(db, TRACKING_CODE, timeout=5))
+        return asyncio.get_running_loop().time() - started
+
+    assert run(waiter()) < 1
+    assert find_bank()["status"] == PaymentStatus.COMPLETE
+
+
+def test_wait_gives_up_after_timeout(db, run, settings, insert_bank, find_bank):
+    settings.VERIFY_LEASE_POLL_SECONDS = 0.01
+    insert_bank(TRACKING_CODE)
+    run(leases.acquire_verify_lease(db, TRACKING_CODE, "first"))
+
+    run(leases.wait_for_verify_result(db, TRACKING_CODE, timeout=0.05))
+    assert find_bank()[leases.LEASE_OWNER] == "first"
+
+
+class Request:
+    def __init__(self, form):
+        self._form = form
+
+    async def form(self):
+        return self._form
+
+
+async def redirected_payment(db, factory):
+    bank = factory.create(db=db, bank_type="SEP")
+    bank.set_amount(20000)
+    record = await bank.ready("order", {"id": 1})
+    await bank.redirect_gateway()
+    return {"ResNum": record.tracking_code, "RefNum": "ref", "State": "OK"}
+
+
+@pytest.mark.parametrize("fast_serialization", [False, True])
+def test_duplicate_callbacks_verify_once(db, run, settings, gateway_calls, fast_serialization):
+    settings.FAST_SERIALIZATION = fast_serialization
+    settings.VERIFY_LEASE_POLL_SECONDS = 0.01
+    factory = load("bankfactories").BankFactory()
+
+    async def payment():
+        form = await redirected_payment(db, factory)
+        banks = [factory.create(db=db, bank_type="SEP") for _ in range(3)]
+        await asyncio.gather(*[bank.verify_from_gateway(Request(form)) for bank in banks])
+        return [(await bank.get_bank()).status for bank in banks]
+
+    statuses = run(payment())
+
+    assert statuses == [PaymentStatus.COMPLETE] * 3
+    # one token request and a single verify request
+    assert len(gateway_calls) == 2
+    assert leases.LEASE_OWNER not in run(db["transaction"].find_one({}))
+
+
+def test_lost_lease_does_not_verify(db, run, settings, gateway_calls, monkeypatch):
+    settings.VERIFY_LEASE_POLL_SECONDS = 0.01
+    settings.VERIFY_LEASE_WAIT_SECONDS = 0.05
+    factory = load("bankfactories").BankFactory()
+    banks = load("banks.banks")
+
+    async def renew_after_takeover(db, tracking_code, owner, ttl=None):
+        # the lease expired and another process took it
+        await db["transaction"].update_one(
+            {"_id": tracking_code}, {"$set": {leases.LEASE_OWNER: "other"}})
+        return await leases.renew_verify_lease(db, tracking_code, owner, ttl)
+
+    monkeypatch.setattr(banks, "renew_verify_lease", renew_after_takeover)
+
+    async def payment():
+        form = await redirected_payment(db, factory)
+        bank = factory.create(db=db, bank_type="SEP")
+        await bank.verify_from_gateway(Request(form))
+        return await bank.get_bank()
+
+    bank = run(payment())
+
+    assert bank.status == PaymentStatus.RETURN_FROM_BANK
+    # only the token request, the new owner verifies
+    assert len(gateway_calls) == 1
+    assert run(db["transaction"].find_one({}))[leases.LEASE_OWNER] == "other"
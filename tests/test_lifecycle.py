@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from stubs import load
+
+lifecycle = load("lifecycle")
+BankGatewayShuttingDown = load("exceptions").BankGatewayShuttingDown
+
+
+class Database:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def command(self, name):
+        if self.error:
+            raise self.error
+        return {"ok": 1}
+
+
+class Bank:
+    def get_warmup_urls(self):
+        return ["https://gateway.local/token", "https://gateway.local/verify"]
+
+
+class BankFactory:
+    def get_bank_priorities(self):
+        return ["SEP", "IDPAY"]
+
+    def create(self, db, bank_type):
+        return Bank()
+
+
+def test_startup_warms_gateways_concurrently(run, monkeypatch):
+    manager = lifecycle.PaymentLifecycle(BankFactory())
+
+    async def warmup(bank_type, url):
+        await asyncio.sleep(0.1)
+        manager.metrics.warmed_gateways += 1
+
+    monkeypatch.setattr(manager, "_warmup", warmup)
+
+    async def startup():
+        metrics = await manager.startup(Database())
+        assert manager.get_session() is not None
+        await manager.shutdown()
+        return metrics
+
+    metrics = run(startup())
+
+    assert metrics.warmed_gateways == 4
+    assert metrics.warmup_seconds < 0.3
+
+
+def test_startup_without_mongo_opens_no_session(run):
+    manager = lifecycle.PaymentLifecycle(BankFactory())
+
+    with pytest.raises(ConnectionError):
+        run(manager.startup(Database(error=ConnectionError())))
+    assert manager._session is None
+
+
+def test_shutdown_drains_operations(run):
+    manager = lifecycle.PaymentLifecycle(BankFactory())
+
+    async def operation():
+        async with manager.operation("verify"):
+            async with manager.operation("nested"):
+                await asyncio.sleep(0.05)
+
+    async def shutdown():
+        tasks = [asyncio.create_task(operation()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert manager.metrics.in_flight == 2
+
+        metrics = await manager.shutdown(timeout=1)
+        assert all(task.done() for task in tasks)
+        with pytest.raises(BankGatewayShuttingDown):
+            async with manager.operation("ready"):
+                pass
+        return metrics
+
+    metrics = run(shutdown())
+
+    assert (metrics.in_flight, metrics.drained, metrics.aborted) == (0, 2, 0)
+
+
+def test_shutdown_waits_for_aborted_operations(run, settings):
+    settings.LIFECYCLE_ABORT_GRACE_SECONDS = 1
+    manager = lifecycle.PaymentLifecycle(BankFactory())
+    finished = []
+
+    async def operation():
+        async with manager.operation("verify"):
+            try:
+                await asyncio.sleep(10)
+            finally:
+                # cleanup after cancellation still sees the open session
+                await asyncio.sleep(0.05)
+                finished.append(manager.get_session() is not None)
+
+    async def shutdown():
+        await manager.startup(Database(), bank_types=[])
+        task = asyncio.create_task(operation())
+        await asyncio.sleep(0)
+
+        metrics = await manager.shutdown(timeout=0.05)
+        assert task.cancelled()
+        return metrics
+
+    metrics = run(shutdown())
+
+    assert finished == [True]
+    assert (metrics.in_flight, metrics.drained, metrics.aborted) == (0, 0, 1)
+    assert manager.get_session() is None
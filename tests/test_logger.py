@@ -0,0 +1,78 @@
+import logging
+from collections import namedtuple
+
+import pytest
+from stubs import load
+
+structured = load("logger")
+
+
+@pytest.fixture
+def records():
+    handler = logging.Handler()
+    handler.emit = lambda record: captured.append(record)
+    captured = []
+    logger = logging.getLogger("tests.structured")
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield captured
+    logger.removeHandler(handler)
+
+
+def test_redacts_nested_fields(records):
+    logger = structured.StructuredLogger("tests.structured")
+
+    logger.debug("SEP time out gateway", data={
+        "ResNum": "5f1d7f9a",
+        "CellNumber": "09121234567",
+        "items": [{"SecurePan": "603799******1234"}],
+        "cards": ({"CellNumber": "09120000000"},),
+    })
+
+    data = records[0].data
+    assert data["ResNum"] == "5f1d7f9a"
+    assert data["CellNumber"] == "*******4567"
+    assert data["items"] == [{"SecurePan": "************1234"}]
+    assert data["cards"] == ({"CellNumber": "*******0000"},)
+
+
+def test_logs_other_objects_as_they_are(records):
+    logger = structured.StructuredLogger("tests.structured")
+    Card = namedtuple("Card", "CellNumber pan")
+    card = Card("09121234567", "603799******1234")
+
+    logger.debug("SEP time out gateway", data=card, cards=[card, (card,)])
+
+    assert records[0].data is card
+    assert records[0].cards == [card, (card,)]
+    assert records[0].cards[0] is card
+
+
+def test_lazy_fields_only_for_emitted_records(records):
+    logger = structured.StructuredLogger("tests.structured")
+    calls = []
+
+    logging.getLogger("tests.structured").setLevel(logging.INFO)
+    logger.debug("Change bank payment status", status=lambda: calls.append(1))
+    assert calls == [] and records == []
+
+    logger.info("Change bank payment status", status=lambda: "Complete")
+    assert records[0].status == "Complete"
+
+
+def test_sampled_events(records, settings):
+    settings.LOG_SAMPLE_RATES = {"Request create bank": 0}
+    logger = structured.StructuredLogger("tests.structured")
+
+    logger.debug("Request create bank", bank_type="SEP")
+    logger.debug("Create bank")
+
+    assert [record.getMessage() for record in records] == ["Create bank"]
+
+
+def test_reports_the_calling_line(records):
+    logger = structured.StructuredLogger("tests.structured")
+
+    logger.critical("SEP gateway reject payment")
+
+    assert records[0].filename == "test_logger.py"
@@ -0,0 +1,44 @@
+from stubs import load
+
+models = load("models")
+Bank = models.Bank
+
+DOCUMENT = {
+    "_id": "5f1d7f9a2c3b4a5d6e7f8091",
+    "status": models.PaymentStatus.WAITING,
+    "bank_type": "SEP",
+    "tracking_code": "5f1d7f9a2c3b4a5d6e7f8091",
+    "amount": "20000",
+    "col_obj": {"order_id": 1},
+    "created_at": 1600000000,
+}
+
+
+def test_document_round_trip():
+    bank = Bank.from_document(DOCUMENT)
+
+    assert bank.id == DOCUMENT["_id"]
+    assert bank.to_document() == DOCUMENT
+    assert bank == Bank(**DOCUMENT)
+    assert bank.__fields_set__ == {
+        "id", "status", "bank_type", "tracking_code", "amount", "col_obj", "created_at",
+    }
+
+
+def test_to_document_leaves_out_none_fields():
+    bank = Bank(_id="code", amount="20000", created_at=0)
+
+    assert bank.to_document() == {"_id": "code", "amount": "20000", "created_at": 0}
+    assert bank.to_document() == bank.dict(by_alias=True, exclude_none=True)
+
+
+def test_from_document_defaults_and_extra_keys():
+    document = {"_id": "code", "lease_owner": "worker", "lease_expires_at": 0}
+
+    bank = Bank.from_document(document)
+
+    assert bank.status is None
+    assert isinstance(bank.created_at, int) and bank.created_at > 0
+    assert bank.__fields_set__ == {"id"}
+    assert "lease_owner" not in bank.to_document()
+    assert not hasattr(bank, "lease_owner")
@@ -0,0 +1,43 @@
+from stubs import load
+
+stats = load("stats")
+models = load("models")
+PaymentStatus = models.PaymentStatus
+
+
+async def count(db, bank, *statuses):
+    for status in statuses:
+        bank.status = status
+        stats.schedule_status_change(db, bank)
+    await stats.wait_pending_stats()
+
+
+def test_statuses_of_a_payment_share_its_window(db, run, settings):
+    settings.STATS_BUCKET_SECONDS = 3600
+    bank = models.Bank(_id="a", bank_type="SEP", amount="20000", created_at=3599)
+
+    # the status changes happen after the window of the payment ends
+    run(count(db, bank, PaymentStatus.WAITING, PaymentStatus.COMPLETE))
+
+    [window] = run(stats.get_gateway_stats(db))
+    assert window.bucket == 0
+    assert window.success_rate == 1.0
+    assert window.volume == 20000
+
+
+def test_gateway_stats_per_window(db, run, settings):
+    settings.STATS_BUCKET_SECONDS = 3600
+    complete = models.Bank(_id="a", bank_type="SEP", amount="20000", created_at=10)
+    cancel = models.Bank(_id="b", bank_type="SEP", amount="50000", created_at=20)
+    later = models.Bank(_id="c", bank_type="SEP", amount="30000", created_at=3600)
+
+    run(count(db, complete, PaymentStatus.WAITING, PaymentStatus.COMPLETE))
+    run(count(db, cancel, PaymentStatus.WAITING, PaymentStatus.CANCEL_BY_USER))
+    run(count(db, later, PaymentStatus.WAITING))
+
+    first, second = run(stats.get_gateway_stats(db, bank_type="SEP"))
+    assert (first.bucket, first.started, first.completed) == (0, 2, 1)
+    assert first.success_rate == 0.5
+    assert first.average_amount == 20000
+    assert (second.bucket, second.success_rate) == (3600, 0.0)
+    assert run(stats.get_gateway_stats(db, since=3600)) == [second]
@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from stubs import load
+
+tracing = load("tracing")
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """enable the package tracer with an in memory sink"""
+    sink = tracing.InMemorySink()
+    monkeypatch.setattr(tracing.tracer, "enabled", True)
+    monkeypatch.setattr(tracing.tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(tracing.tracer, "_sink", sink)
+    return sink
+
+
+def test_nested_spans(spans):
+    with tracing.tracer.span("bank.verify", tracking_code="code") as parent:
+        with tracing.tracer.span("db.find_bank") as child:
+            pass
+
+    child_span, parent_span = spans.get_spans()
+    assert child_span["parent_id"] == parent.span_id
+    assert child_span["trace_id"] == "code"
+    assert parent_span["parent_id"] is None
+    assert child.duration <= parent.duration
+
+
+def test_ready_span_gets_the_tracking_code(db, run, spans, gateway_calls):
+    bank = load("bankfactories").BankFactory().create(db=db, bank_type="SEP")
+    bank.set_amount(20000)
+
+    record = run(bank.ready("order", {"id": 1}))
+
+    [ready] = [span for span in spans.get_spans() if span["name"] == "bank.ready"]
+    assert ready["trace_id"] == record.tracking_code
+    names = {span["name"] for span in spans.get_spans(record.tracking_code)}
+    assert {"bank.ready", "db.save_bank"} <= names
+
+
+def test_sampling_by_tracking_code():
+    first = tracing.Tracer(enabled=True, sample_rate=0.5)
+    second = tracing.Tracer(enabled=True, sample_rate=0.5)
+    codes = [f"{number:024x}" for number in range(1000)]
+
+    sampled = [code for code in codes if first.is_sampled(code)]
+
+    # every process keeps the same payments
+    assert sampled == [code for code in codes if second.is_sampled(code)]
+    assert 400 < len(sampled) < 600
+    assert not tracing.Tracer(enabled=True, sample_rate=0).is_sampled(codes[0])
+
+
+def test_unsampled_spans_are_not_exported():
+    sink = tracing.InMemorySink()
+    tracer = tracing.Tracer(enabled=True, sample_rate=0, sink=sink)
+
+    with tracer.span("bank.ready", tracking_code="code"):
+        pass
+
+    assert sink.get_spans() == []
+
+
+def test_memory_sink_keeps_the_last_spans(settings):
+    settings.TRACING_MEMORY_MAX_SPANS = 3
+    sink = tracing.InMemorySink()
+    tracer = tracing.Tracer(enabled=True, sample_rate=1.0, sink=sink)
+
+    for number in range(5):
+        with tracer.span(f"span {number}"):
+            pass
+
+    assert [span["name"] for span in sink.get_spans()] == ["span 2", "span 3", "span 4"]
+
+
+def test_json_lines_sink(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    sink = tracing.JsonLinesSink(str(path))
+    tracer = tracing.Tracer(enabled=True, sample_rate=1.0, sink=sink)
+
+    with tracer.span("bank.verify", tracking_code="code", bank_type="SEP"):
+        with tracer.span("db.find_bank"):
+            pass
+    tracer.flush()
+
+    lines = [tracing.json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["db.find_bank", "bank.verify"]
+    assert lines[1]["attributes"] == {"bank_type": "SEP"}
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+
+    sink.close()
+    sink.close()
+
+
+def test_lifecycle_shutdown_writes_spans(tmp_path, run, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    sink = tracing.JsonLinesSink(str(path))
+    monkeypatch.setattr(tracing.tracer, "_sink", sink)
+
+    for number in range(3):
+        sink.export(tracing.Span(tracing.tracer, f"span {number}"))
+    run(load("lifecycle").PaymentLifecycle().shutdown())
+
+    assert len(path.read_text().splitlines()) == 3
+    sink.close()
+
+
+def test_json_lines_written_at_exit(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    script = textwrap.dedent(f"""
+        from stubs import load
+
+        tracing = load("tracing")
+        tracer = tracing.Tracer(
+            enabled=True, sample_rate=1.0, sink=tracing.JsonLinesSink({str(path)!r}))
+        for number in range(3):
+            with tracer.span("span", tracking_code=str(number)):
+                pass
+    """)
+    benchmarks = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+
+    subprocess.run([sys.executable, "-c", script], cwd=str(tmp_path), check=True,
+                   env={**os.environ, "PYTHONPATH": benchmarks})
+
+    assert len(path.read_text().splitlines()) == 3
@@ -0,0 +1,19 @@
+import pytest
+from stubs import load
+
+utils = load("utils")
+
+BODY = '{"status": 1, "ResultDescription": "عملیات با موفقیت انجام شد"}'.encode("utf-8")
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_json_loads(monkeypatch, fast):
+    if fast:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(utils, "orjson", None)
+
+    assert utils.json_loads(BODY) == {
+        "status": 1, "ResultDescription": "عملیات با موفقیت انجام شد",
+    }
+    assert utils.json_loads(BODY.decode("utf-8"))["status"] == 1
@@ -0,0 +1,239 @@
+"""
+Spans for the payment lifecycle.
+
+Every span carries the payment tracking code as its trace id, so the spans
+recorded by ``ready``, ``redirect_gateway``, ``verify_from_gateway`` and
+``verify`` in different requests and processes can be joined afterwards.
+Sampling is decided from the tracking code, every process keeps or drops
+the same payments.
+"""
+import atexit
+import importlib
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from contextvars import ContextVar
+
+from .default_settings import settings
+from .logger import logger
+
+_current_span = ContextVar("iranian_bank_gateways_span", default=None)
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled, every method does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_tracking_code(self, tracking_code):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, tracer, name: str, tracking_code: str = None, attributes: dict = None):
+        self._tracer = tracer
+        self._token = None
+        self.name = name
+        self.tracking_code = tracking_code
+        self.attributes = attributes or {}
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = None
+        self.start = None
+        self.duration = None
+        self.error = None
+        self._started = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.parent_id = parent.span_id
+            if self.tracking_code is None:
+                self.tracking_code = parent.tracking_code
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc_value}"
+        _current_span.reset(self._token)
+        self._tracer.finish(self)
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_tracking_code(self, tracking_code):
+        """for spans started before the tracking code exists, e.g. ready"""
+        self.tracking_code = tracking_code
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.tracking_code,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class InMemorySink:
+    """Keeps the last TRACING_MEMORY_MAX_SPANS spans"""
+
+    def __init__(self, max_spans: int = None):
+        self.spans = deque(maxlen=max_spans or settings.TRACING_MEMORY_MAX_SPANS)
+
+    def export(self, span: Span):
+        self.spans.append(span.to_dict())
+
+    def get_spans(self, tracking_code: str = None) -> list:
+        if tracking_code is None:
+            return list(self.spans)
+        return [span for span in self.spans if span["trace_id"] == tracking_code]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonLinesSink:
+    """
+    Spans are encoded and written by a background thread, off the event
+    loop. The lifecycle shutdown flushes them, interpreter exit closes it.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.TRACING_JSONL_PATH
+        self._closed = False
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write, name="iranian_bank_gateways_spans", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def export(self, span: Span):
+        self._queue.put(span.to_dict())
+
+    def _write(self):
+        with open(self.path, "a") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                if isinstance(record, threading.Event):
+                    f.flush()
+                    record.set()
+                    continue
+                f.write(json.dumps(record, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def flush(self, timeout: float = None) -> bool:
+        """wait until the spans exported so far are written"""
+        if self._closed:
+            return True
+        written = threading.Event()
+        self._queue.put(written)
+        return written.wait(timeout)
+
+    def close(self):
+        """write the queued spans and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+
+class OpenTelemetrySink:
+    """Replay finished spans through the configured OpenTelemetry tracer"""
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._tracer = trace.get_tracer("iranian_bank_gateways")
+
+    def export(self, span: Span):
+        attributes = {
+            key: value for key, value in span.attributes.items()
+            if isinstance(value, (str, bool, int, float))
+        }
+        attributes["payment.tracking_code"] = span.tracking_code or ""
+        if span.error:
+            attributes["error"] = span.error
+        start = int(span.start * 1e9)
+        otel_span = self._tracer.start_span(
+            span.name, start_time=start, attributes=attributes)
+        otel_span.end(end_time=start + int(span.duration * 1e9))
+
+
+class Tracer:
+    def __init__(self, enabled: bool = None, sample_rate: float = None, sink=None):
+        self.enabled = settings.TRACING_ENABLED if enabled is None else enabled
+        self.sample_rate = settings.TRACING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self._sink = sink
+
+    @property
+    def sink(self):
+        if self._sink is None:
+            package, attr = settings.TRACING_SINK_CLASS.rsplit(".", 1)
+            self._sink = getattr(importlib.import_module(package), attr)()
+        return self._sink
+
+    def span(self, name: str, tracking_code: str = None, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, tracking_code, attributes)
+
+    def is_sampled(self, tracking_code: str = None) -> bool:
+        if self.sample_rate >= 1:
+            return True
+        if tracking_code is None:
+            return random.random() < self.sample_rate
+        return zlib.crc32(str(tracking_code).encode()) % 10000 < self.sample_rate * 10000
+
+    def flush(self, timeout: float = None):
+        """write the spans a buffering sink still holds"""
+        flush = getattr(self._sink, "flush", None)
+        if flush is not None and not flush(timeout):
+            logger.critical("Spans not written before timeout", timeout=timeout)
+
+    def finish(self, span: Span):
+        if not self.is_sampled(span.tracking_code):
+            return
+        try:
+            self.sink.export(span)
+        except Exception:
+            # tracing must never fail a payment
+            logger.exception("Export span failed", span=span.name)
+
+
+tracer = Tracer()
+
+
+def configure(enabled: bool = True, sample_rate: float = 1.0, sink=None) -> Tracer:
+    """Change the package tracer at runtime, e.g. on application startup"""
+    tracer.enabled = enabled
+    tracer.sample_rate = sample_rate
+    tracer._sink = sink
+    return tracer
@@ -3,6 +3,11 @@ from urllib import parse
 
 from .types import DictQuerystring
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def get_json(resp):
     """
@@ -15,6 +20,29 @@ def get_json(resp):
     return json.loads(resp.content.decode("utf-8"))
 
 
+def json_loads(data: bytes):
+    """
+    :param data: raw json body, e.g. the bytes of a gateway response.
+
+    :return: decoded json, with orjson when it is installed
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def get_collection(db, name: str):
+    """
+    :param db: mongo database passed to the bank classes.
+    :param name: collection name.
+
+    :return: the raw collection, for operations MongoCrud does not cover.
+    """
+
+    return db[name]
+
+
 def append_querystring(url: str, params: dict) -> str:
     url_parts = list(parse.urlparse(url))
     query = dict(parse.parse_qsl(url_parts[4]))